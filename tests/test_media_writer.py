@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+
+from usb_isoupdater.media_writer import MediaWriter, copy_to_media, device_throughput
+
+BLOCK_SIZE = 64 * 1024
+
+
+@pytest.mark.parametrize("direct", [False, True])
+def test_media_writer_writes_unaligned_chunks(tmp_path, direct):
+    data = os.urandom(5 * BLOCK_SIZE + 123)
+    target = tmp_path / "image.iso"
+    with MediaWriter(target, len(data), block_size=BLOCK_SIZE, sync_interval=2 * BLOCK_SIZE, direct=direct) as writer:
+        for offset in range(0, len(data), 10_000):
+            writer.write(data[offset : offset + 10_000])
+    assert target.read_bytes() == data
+    assert device_throughput(target) > 0
+
+
+def test_media_writer_reservation_does_not_extend_file(tmp_path):
+    target = tmp_path / "image.iso"
+    with MediaWriter(target, 10 * BLOCK_SIZE, block_size=BLOCK_SIZE) as writer:
+        writer.write(b"x" * 100)
+        # the reserved size must never show up as zero filled file content
+        assert os.path.getsize(target) == 0
+    assert target.read_bytes() == b"x" * 100
+
+
+def test_media_writer_rejects_unaligned_block_size(tmp_path):
+    with pytest.raises(ValueError):
+        MediaWriter(tmp_path / "image.iso", block_size=1000)
+
+
+def test_copy_to_media(tmp_path):
+    source = tmp_path / "staged.iso"
+    source.write_bytes(os.urandom(300_000))
+    copy_to_media(source, tmp_path / "copy.iso")
+    assert (tmp_path / "copy.iso").read_bytes() == source.read_bytes()
+
+
+def test_throughput_only_counts_io_time(tmp_path):
+    target = tmp_path / "image.iso"
+    with MediaWriter(target, block_size=BLOCK_SIZE) as writer:
+        writer.write(b"x" * BLOCK_SIZE)
+        # a slow mirror keeps the writer open without the device doing anything
+        time.sleep(0.5)
+    assert writer.io_bytes == BLOCK_SIZE
+    assert writer.io_seconds < 0.5
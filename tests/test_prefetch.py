@@ -0,0 +1,157 @@
+import hashlib
+
+import pytest
+import requests
+from distro_sources.distro_base import Distro
+from distro_sources.http_distros import DISTROS
+
+from usb_isoupdater import config, prefetch
+from usb_isoupdater.prefetch import PrefetchScheduler, staged_file
+
+PAYLOAD = b"fake iso content"
+
+
+class FakeDistro(Distro):
+    name = "Fake"
+    architectures = ["amd64", "arm64"]  # noqa: RUF012
+    failing_download = False
+    checksum_host_down = False
+
+    def __init__(self, architecture, version):
+        super().__init__(architecture, version)
+        self.filename = f"fake-{version}-{architecture}.iso"
+        self.checksums = {self.filename: hashlib.sha256(PAYLOAD).hexdigest()}
+
+    def verify_checksum(self, path):
+        if self.checksum_host_down:
+            raise requests.ConnectionError("checksum host unreachable")
+        return super().verify_checksum(path)
+
+    def download(self, path, direct=False):
+        with open(f"{path}/{self.filename}", "wb") as f:
+            f.write(PAYLOAD[:4])
+            if self.failing_download:
+                raise ConnectionError("all mirrors failed")
+            f.write(PAYLOAD[4:])
+
+
+class BrokenDistro(Distro):
+    def __init__(self, architecture):
+        super().__init__(architecture, "latest")
+
+
+@pytest.fixture
+def known_configs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "KNOWN_CONFIGS_DIR", tmp_path / "known_configs")
+    monkeypatch.setitem(DISTROS, "Fake", FakeDistro)
+    monkeypatch.setitem(DISTROS, "Broken", BrokenDistro)
+    return tmp_path / "known_configs"
+
+
+def register_stick(path, vendorid, distros):
+    """Writes a stick config with the given {section: (name, architectures, version)} and registers it."""
+    lines = ["[USB]", "devicepath = /dev/sdb1", f"vendorid = {vendorid}", "modelid = 4519"]
+    for section, (name, architectures, version) in distros.items():
+        lines += [f"[{section}]", f"name = {name}", f"architectures = {architectures}", f"version = {version}"]
+    path.write_text("\n".join(lines) + "\n")
+    config.register_config(path)
+
+
+def test_sticks_mounted_at_the_same_path_are_all_known(tmp_path, known_configs_dir):
+    mountpoint = tmp_path / ".iso-usbupdater.ini"
+    register_stick(mountpoint, "05a9", {"fake": ("Fake", "amd64", "1")})
+    register_stick(mountpoint, "0781", {"fake": ("Fake", "arm64", "1")})
+
+    distros = PrefetchScheduler(tmp_path / "staging").configured_distros()
+    assert sorted(distro.filename for distro in distros) == ["fake-1-amd64.iso", "fake-1-arm64.iso"]
+
+
+def test_sticks_of_the_same_model_are_all_known(tmp_path, known_configs_dir):
+    register_stick(tmp_path / "first.ini", "05a9", {"fake": ("Fake", "amd64", "1")})
+    register_stick(tmp_path / "second.ini", "05a9", {"fake": ("Fake", "arm64", "1")})
+
+    distros = PrefetchScheduler(tmp_path / "staging").configured_distros()
+    assert sorted(distro.filename for distro in distros) == ["fake-1-amd64.iso", "fake-1-arm64.iso"]
+
+
+def test_saving_a_stick_config_replaces_its_snapshot(tmp_path, known_configs_dir):
+    stick = tmp_path / "stick.ini"
+    register_stick(stick, "05a9", {"amd64": ("Fake", "amd64", "1"), "arm64": ("Fake", "arm64", "1")})
+    manager = config.ConfigManager(stick)
+    manager.config.remove_section("arm64")
+    manager.save_config()
+
+    assert len(config.known_configs()) == 1
+    distros = PrefetchScheduler(tmp_path / "staging").configured_distros()
+    assert [distro.filename for distro in distros] == ["fake-1-amd64.iso"]
+
+
+def test_prefetch_stages_verified_downloads(tmp_path, known_configs_dir):
+    register_stick(tmp_path / "stick.ini", "05a9", {"fake": ("Fake", "amd64", "1")})
+    scheduler = PrefetchScheduler(tmp_path / "staging")
+    scheduler.prefetch_once()
+
+    staged = staged_file(FakeDistro("amd64", "1"), tmp_path / "staging")
+    assert staged is not None
+    assert staged.read_bytes() == PAYLOAD
+    assert list(scheduler.partial_dir.iterdir()) == []
+
+
+def test_failed_download_leaves_nothing_staged(tmp_path, known_configs_dir, monkeypatch):
+    monkeypatch.setattr(FakeDistro, "failing_download", True)
+    register_stick(tmp_path / "stick.ini", "05a9", {"fake": ("Fake", "amd64", "1")})
+    scheduler = PrefetchScheduler(tmp_path / "staging")
+    scheduler.prefetch_once()
+
+    assert staged_file(FakeDistro("amd64", "1"), tmp_path / "staging") is None
+    assert list(scheduler.partial_dir.iterdir()) == []
+
+
+def test_unreachable_checksum_host_keeps_the_staged_iso(tmp_path, known_configs_dir, monkeypatch):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    (staging / "fake-1-amd64.iso").write_bytes(PAYLOAD)
+    register_stick(tmp_path / "stick.ini", "05a9", {"fake": ("Fake", "amd64", "1")})
+    monkeypatch.setattr(FakeDistro, "checksum_host_down", True)
+    downloads = []
+    monkeypatch.setattr(FakeDistro, "download", lambda self, path, direct=False: downloads.append(path))
+    PrefetchScheduler(staging).prefetch_once()
+
+    assert downloads == []
+    assert (staging / "fake-1-amd64.iso").read_bytes() == PAYLOAD
+
+
+def test_unresolvable_distro_does_not_stop_the_others(tmp_path, known_configs_dir):
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    (staging / "fake-0-amd64.iso").write_bytes(PAYLOAD)
+    register_stick(
+        tmp_path / "stick.ini",
+        "05a9",
+        {"broken": ("Broken", "amd64", "latest"), "fake": ("Fake", "amd64", "1")},
+    )
+    scheduler = PrefetchScheduler(staging)
+    scheduler.prefetch_once()
+
+    assert (staging / "fake-1-amd64.iso").exists()
+    # the pass was incomplete, so nothing is treated as outdated
+    assert (staging / "fake-0-amd64.iso").exists()
+
+
+def test_run_survives_a_failing_pass(tmp_path, monkeypatch):
+    passes = []
+
+    def failing_pass():
+        passes.append(1)
+        raise TypeError("unexpected")
+
+    def sleep(seconds):
+        if len(passes) == 2:
+            raise SystemExit
+
+    scheduler = PrefetchScheduler(tmp_path / "staging")
+    monkeypatch.setattr(scheduler, "prefetch_once", failing_pass)
+    monkeypatch.setattr(prefetch.time, "sleep", sleep)
+    with pytest.raises(SystemExit):
+        scheduler.run()
+    assert len(passes) == 2
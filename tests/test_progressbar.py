@@ -0,0 +1,155 @@
+import errno
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from usb_isoupdater.media_writer import MediaWriter
+from usb_isoupdater.progressbar import DownloadWithProgress, TransferStalled
+
+DATA = os.urandom(1_000_000)
+OTHER_DATA = os.urandom(900_000)
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """
+    Serves DATA with Range support, the path selects how the mirror misbehaves:
+    /ok, /hang (stops sending, right away when resumed), /slow (trickles on its first request),
+    /trickle (trickles on every request), /drop (closes early on its first requests but always
+    makes progress), /norange (ignores Range), /badrange (resumes at the wrong offset)
+    and /other (serves a different file).
+    """
+
+    requests: list[tuple[str, int]] = []  # noqa: RUF012
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = OTHER_DATA if self.path == "/other" else DATA
+        byte_range = self.headers.get("Range")
+        start = int(byte_range[len("bytes=") : -1]) if byte_range and self.path != "/norange" else 0
+        self.requests.append((self.path, start))
+        self.send_response(206 if start else 200)
+        if self.path == "/badrange":
+            start = 0
+        self.send_header("Content-Length", str(len(data) - start))
+        if byte_range and self.path != "/norange":
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.end_headers()
+
+        if self.path == "/hang":
+            if not start:
+                self.wfile.write(data[start : start + 100_000])
+                self.wfile.flush()
+            time.sleep(1)
+        elif self.path == "/trickle" or (self.path == "/slow" and len(self.requests) == 1):
+            self.wfile.write(data[start : start + 100_000])
+            self.wfile.flush()
+            for offset in range(start + 100_000, start + 100_100, 10):
+                self.wfile.write(data[offset : offset + 10])
+                self.wfile.flush()
+                time.sleep(0.05)
+        elif self.path == "/drop" and len(self.requests) <= 3:
+            self.wfile.write(data[start : start + 200_000])
+        else:
+            self.wfile.write(data[start:])
+
+
+@pytest.fixture
+def server():
+    MirrorHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def download(url, path, **kwargs):
+    kwargs.setdefault("read_timeout", 0.5)
+    DownloadWithProgress(url, str(path), **kwargs).download()
+    return path.read_bytes()
+
+
+def test_hung_mirror_fails_over_and_resumes(server, tmp_path):
+    data = download(f"{server}/hang", tmp_path / "image.iso", mirrors=[f"{server}/ok"], error_budget=1)
+    assert data == DATA
+    assert MirrorHandler.requests == [("/hang", 0), ("/hang", 100_000), ("/ok", 100_000)]
+
+
+def test_slow_transfer_reconnects_at_offset(server, tmp_path):
+    data = download(f"{server}/slow", tmp_path / "image.iso", read_timeout=5, min_speed=100_000, speed_window=0.2)
+    assert data == DATA
+    assert MirrorHandler.requests[0] == ("/slow", 0)
+    assert MirrorHandler.requests[1][1] >= 100_000
+
+
+def test_trickling_mirror_fails_over(server, tmp_path):
+    data = download(
+        f"{server}/trickle",
+        tmp_path / "image.iso",
+        mirrors=[f"{server}/ok"],
+        read_timeout=5,
+        min_speed=100_000,
+        speed_window=0.2,
+        error_budget=2,
+    )
+    assert data == DATA
+    assert [path for path, _ in MirrorHandler.requests] == ["/trickle", "/trickle", "/ok"]
+
+
+def test_check_speed_uses_a_sliding_window():
+    downloader = DownloadWithProgress("http://unused", "unused", min_speed=1000, speed_window=10)
+    now = time.monotonic()
+    window = deque([(now - 20, 0), (now - 11, 0), (now - 5, 50_000)])
+    downloader.offset = 50_000
+    # the first sample is outside the window, the rest moved 50 kB in 11 s
+    downloader._check_speed(window)
+    assert window[0] == (now - 11, 0)
+
+    downloader.offset = 50_001
+    window = deque([(now - 11, 50_000)])
+    with pytest.raises(TransferStalled):
+        downloader._check_speed(window)
+
+
+def test_progress_does_not_use_up_the_error_budget(server, tmp_path):
+    data = download(f"{server}/drop", tmp_path / "image.iso", error_budget=1)
+    assert data == DATA
+    assert [start for _, start in MirrorHandler.requests] == [0, 200_000, 400_000, 600_000]
+
+
+def test_mirror_without_range_support_restarts_from_zero(server, tmp_path):
+    data = download(f"{server}/hang", tmp_path / "image.iso", mirrors=[f"{server}/norange"], error_budget=1)
+    assert data == DATA
+    assert MirrorHandler.requests == [("/hang", 0), ("/hang", 100_000), ("/norange", 0)]
+
+
+def test_mirror_resuming_at_the_wrong_offset_is_skipped(server, tmp_path):
+    data = download(
+        f"{server}/hang", tmp_path / "image.iso", mirrors=[f"{server}/badrange", f"{server}/ok"], error_budget=1
+    )
+    assert data == DATA
+    assert MirrorHandler.requests == [("/hang", 0), ("/hang", 100_000), ("/badrange", 100_000), ("/ok", 100_000)]
+
+
+def test_mirror_serving_another_file_is_skipped(server, tmp_path):
+    data = download(
+        f"{server}/hang", tmp_path / "image.iso", mirrors=[f"{server}/other", f"{server}/ok"], error_budget=1
+    )
+    assert data == DATA
+    assert [path for path, _ in MirrorHandler.requests] == ["/hang", "/hang", "/other", "/ok"]
+
+
+def test_local_write_errors_are_not_blamed_on_mirrors(server, tmp_path, monkeypatch):
+    def full_disk(self, data):
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    monkeypatch.setattr(MediaWriter, "write", full_disk)
+    with pytest.raises(OSError) as excinfo:
+        download(f"{server}/ok", tmp_path / "image.iso", mirrors=[f"{server}/ok"])
+    assert excinfo.value.errno == errno.ENOSPC
+    assert len(MirrorHandler.requests) == 1
@@ -0,0 +1,106 @@
+from distro_sources import torrent_catalog
+from distro_sources.torrent_catalog import TorrentCatalog
+from distro_sources.torrent_distros import TorrentDistro, parse_distrowatch_table, parse_fosstorrents_feed
+
+
+class FakeResponse:
+    def __init__(self, torrents, status_code=200):
+        self.torrents = torrents
+        self.status_code = status_code
+        self.headers = {"ETag": '"1"'}
+
+    def raise_for_status(self):
+        pass
+
+
+def listing_parser(response, seen):
+    distros = [TorrentDistro(name, url, "") for name, url in response.torrents.items() if url not in seen]
+    return distros, set(response.torrents.values())
+
+
+def broken_parser(response, seen):
+    return None.find_all("tr")
+
+
+def make_catalog(tmp_path, monkeypatch, feeds, parsers=None):
+    monkeypatch.setattr(torrent_catalog.requests, "get", lambda url, **kwargs: feeds[url])
+    sources = {name: (name, (parsers or {}).get(name, listing_parser)) for name in feeds}
+    return TorrentCatalog(tmp_path / "catalog.json", sources)
+
+
+def test_refresh_merges_and_deduplicates_sources(tmp_path, monkeypatch):
+    feeds = {
+        "a": FakeResponse({"Debian 12.5 Netinst": "https://a/debian-12.5.0-amd64-netinst.iso.torrent"}),
+        "b": FakeResponse({
+            "Debian Netinst 12.5 (64-bit)": "https://b/Debian-12.5.0-x86_64-netinst.iso.torrent",
+            "Fedora 40": "https://b/fedora-40-aarch64.torrent",
+        }),
+    }
+    catalog = make_catalog(tmp_path, monkeypatch, feeds)
+    assert catalog.refresh() == 2
+    assert sorted(catalog.entries) == ["debian netinst|12.5.0|amd64", "fedora|40|arm64"]
+    assert sorted(catalog.entries["debian netinst|12.5.0|amd64"]["sources"]) == ["a", "b"]
+
+    # the listing is served from the persisted index
+    cached = TorrentCatalog(tmp_path / "catalog.json")
+    assert sorted(distro.version for distro in cached.list_distros()) == ["12.5.0", "40"]
+
+
+def test_refresh_prunes_superseded_entries(tmp_path, monkeypatch):
+    feeds = {"a": FakeResponse({"Fedora 39": "https://a/fedora-39-x86_64.torrent"})}
+    catalog = make_catalog(tmp_path, monkeypatch, feeds)
+    catalog.refresh()
+    feeds["a"] = FakeResponse({"Fedora 40": "https://a/fedora-40-x86_64.torrent"})
+    catalog.refresh()
+    assert list(catalog.entries) == ["fedora|40|amd64"]
+
+
+def test_not_modified_source_keeps_entries(tmp_path, monkeypatch):
+    feeds = {"a": FakeResponse({"Fedora 40": "https://a/fedora-40-x86_64.torrent"})}
+    catalog = make_catalog(tmp_path, monkeypatch, feeds)
+    catalog.refresh()
+    feeds["a"] = FakeResponse({}, status_code=304)
+    assert catalog.refresh() == 0
+    assert list(catalog.entries) == ["fedora|40|amd64"]
+
+
+def test_parser_error_does_not_drop_other_sources(tmp_path, monkeypatch):
+    feeds = {
+        "a": FakeResponse({"Fedora 40": "https://a/fedora-40-x86_64.torrent"}),
+        "broken": FakeResponse({"Debian 12.5": "https://b/debian-12.5.0-amd64.torrent"}),
+    }
+    catalog = make_catalog(tmp_path, monkeypatch, feeds, {"broken": broken_parser})
+    assert catalog.refresh() == 1
+    assert (tmp_path / "catalog.json").exists()
+
+
+FOSSTORRENTS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>FossTorrents</title>
+<item><title>Ubuntu Desktop 24.04.1 (64-bit)</title>
+<link>https://fosstorrents.com/files/ubuntu-24.04.1-desktop-amd64.iso.torrent</link></item>
+</channel></rss>
+"""
+
+DISTROWATCH_TABLE = """<html><body><table style="width:100%; padding: 5px">
+<tr><th>Distribution</th><th>Torrent</th></tr>
+<tr><td><a href="/ubuntu"><img src="ubuntu.png"/><br/>Ubuntu 24.04.1</a></td><td><a href="https://distrowatch.com/ubuntu-24.04.1-desktop-amd64.iso.torrent">torrent</a></td></tr>
+</table></body></html>"""
+
+
+class PageResponse(FakeResponse):
+    def __init__(self, body):
+        super().__init__({})
+        self.content = body
+        self.text = body
+
+
+def test_same_file_from_both_sources_is_one_entry(tmp_path, monkeypatch):
+    feeds = {"fosstorrents": PageResponse(FOSSTORRENTS_FEED), "distrowatch": PageResponse(DISTROWATCH_TABLE)}
+    parsers = {
+        "fosstorrents": lambda response, seen: parse_fosstorrents_feed(response.content, seen),
+        "distrowatch": lambda response, seen: parse_distrowatch_table(response.text, seen),
+    }
+    catalog = make_catalog(tmp_path, monkeypatch, feeds, parsers)
+    assert catalog.refresh() == 1
+    entry = catalog.entries["ubuntu desktop|24.04.1|amd64"]
+    assert sorted(entry["sources"]) == ["distrowatch", "fosstorrents"]
@@ -0,0 +1,98 @@
+from distro_sources.torrent_distros import (
+    TorrentDistro,
+    parse_architecture,
+    parse_distro_name,
+    parse_distrowatch_table,
+    parse_fosstorrents_feed,
+    parse_release_name,
+    parse_version,
+)
+
+FOSSTORRENTS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>FossTorrents</title>
+<item><title>Linux Mint 21.3 Cinnamon (64-bit)</title>
+<link>https://fosstorrents.com/files/linuxmint-21.3-cinnamon-64bit.iso.torrent</link></item>
+<item><title>Linux Mint 21.3 Xfce (64-bit)</title>
+<link>https://fosstorrents.com/files/linuxmint-21.3-xfce-64bit.iso.torrent</link></item>
+</channel></rss>
+"""
+
+DISTROWATCH_TABLE = """<html><body><table style="width:100%; padding: 5px">
+<tr><th>Distribution</th><th>Torrent</th></tr>
+<tr><td><a href="/mint"><img src="mint.png"/><br/>Linux Mint 21.3</a></td><td><a href="https://distrowatch.com/torrents/linuxmint-21.3-cinnamon-64bit.iso.torrent">torrent</a></td></tr>
+<tr><td><a href="/mint"><img src="mint.png"/><br/>Linux Mint 21.3</a></td><td><a href="https://distrowatch.com/torrents/linuxmint-21.3-xfce-64bit.iso.torrent">torrent</a></td></tr>
+</table></body></html>"""
+
+
+def test_parse_architecture_normalizes_aliases():
+    assert parse_architecture("Fedora-Workstation-Live-x86_64-40-1.14.iso") == "amd64"
+    assert parse_architecture("debian-12.5.0-amd64-netinst.iso") == "amd64"
+    assert parse_architecture("linuxmint-21.3-cinnamon-64bit.iso") == "amd64"
+    assert parse_architecture("64-bit") == "amd64"
+    assert parse_architecture("ubuntu-24.04-live-server-arm64.iso") == "arm64"
+    assert parse_architecture("Rocky-9.3-aarch64-dvd.iso") == "arm64"
+    assert parse_architecture("", "nothing here") == "unknown"
+
+
+def test_parse_version_skips_architecture_tokens():
+    assert parse_version("Fedora Workstation x86_64 40") == "40"
+    assert parse_version("Fedora-Workstation-Live-x86_64-40-1.14.iso") == "40"
+    assert parse_version("linuxmint-21.3-cinnamon-64bit.iso") == "21.3"
+    assert parse_version("no version", "Debian 12.5") == "12.5"
+
+
+def test_parse_distro_name_keeps_edition():
+    assert parse_distro_name("Linux Mint 21.3 Cinnamon (64-bit)") == "linux mint cinnamon"
+    assert parse_distro_name("Linux Mint 21.3 Xfce (64-bit)") == "linux mint xfce"
+    assert parse_distro_name("Fedora Workstation x86_64 40") == "fedora workstation"
+
+
+def test_parse_release_name_strips_version_architecture_and_extension():
+    assert parse_release_name("linuxmint-21.3-cinnamon-64bit.iso") == "linuxmint cinnamon"
+    assert parse_release_name("ubuntu-24.04.1-desktop-amd64.iso") == "ubuntu desktop"
+    assert parse_release_name("Fedora-Workstation-Live-x86_64-40-1.14.iso") == "fedora workstation live"
+
+
+def test_editions_get_distinct_catalog_keys():
+    cinnamon, xfce = parse_fosstorrents_feed(FOSSTORRENTS_FEED)[0]
+    assert cinnamon.catalog_key == ("linuxmint cinnamon", "21.3", "amd64")
+    assert xfce.catalog_key == ("linuxmint xfce", "21.3", "amd64")
+
+
+def test_same_file_gets_the_same_key_from_both_sources():
+    fosstorrents = TorrentDistro(
+        "Ubuntu Desktop 24.04.1 (64-bit)",
+        "https://fosstorrents.com/files/ubuntu-24.04.1-desktop-amd64.iso.torrent",
+        "64-bit",
+    )
+    distrowatch = TorrentDistro(
+        "Ubuntu 24.04.1", "https://distrowatch.com/ubuntu-24.04.1-desktop-amd64.iso.torrent", ""
+    )
+    assert fosstorrents.catalog_key == distrowatch.catalog_key == ("ubuntu desktop", "24.04.1", "amd64")
+
+
+def test_same_release_gets_same_arch_and_version_across_sources():
+    fosstorrents = TorrentDistro("Fedora Workstation 40 (64-bit)", "https://a/Fedora-40-x86_64.torrent", "64-bit")
+    distrowatch = TorrentDistro("Fedora 40", "https://b/Fedora-Workstation-Live-x86_64-40-1.14.iso.torrent", "")
+    assert fosstorrents.architecture == distrowatch.architecture == "amd64"
+    assert fosstorrents.version == distrowatch.version == "40"
+
+
+def test_parsers_skip_seen_entries_but_report_all_current():
+    seen = {"https://fosstorrents.com/files/linuxmint-21.3-cinnamon-64bit.iso.torrent"}
+    distros, current = parse_fosstorrents_feed(FOSSTORRENTS_FEED, seen)
+    assert [distro.name for distro in distros] == ["Linux Mint 21.3 Xfce (64-bit)"]
+    assert len(current) == 2
+
+
+def test_parse_distrowatch_table():
+    distros, current = parse_distrowatch_table(DISTROWATCH_TABLE)
+    # all rows share the title "Linux Mint 21.3", the edition comes from the torrent filename
+    assert [distro.catalog_key for distro in distros] == [
+        ("linuxmint cinnamon", "21.3", "amd64"),
+        ("linuxmint xfce", "21.3", "amd64"),
+    ]
+    assert current == {
+        "https://distrowatch.com/torrents/linuxmint-21.3-cinnamon-64bit.iso.torrent",
+        "https://distrowatch.com/torrents/linuxmint-21.3-xfce-64bit.iso.torrent",
+    }
@@ -8,6 +8,8 @@ Debian = amd64, arm64, armel, i386, mips64el, mipsel
 """
 
 import configparser
+import shutil
+import uuid
 from pathlib import Path
 
 import pyudev
@@ -16,6 +18,30 @@ from distro_sources.distro_base import Distro
 from distro_sources.http_distros import DISTROS
 
 CONFIG_FILENAME = Path(".iso-usbupdater.ini")
+CACHE_DIR = Path.home() / ".cache" / "usb-isoupdater"
+# snapshots of every stick config seen, so the prefetcher knows them while the stick is unplugged
+KNOWN_CONFIGS_DIR = CACHE_DIR / "known_configs"
+
+
+def register_config(config_file: Path) -> None:
+    """
+    Stores a snapshot of a stick config in the known configs.
+    Snapshots are named after the stick's id, so every save replaces that stick's previous
+    snapshot and sticks mounted at the same path or of the same model never collide.
+    """
+    config_file = Path(config_file)
+    if not config_file.is_file():
+        return
+    stick_id = ConfigManager(config_file).get_stick_id()
+    KNOWN_CONFIGS_DIR.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(config_file, KNOWN_CONFIGS_DIR / f"{stick_id}.ini")
+
+
+def known_configs() -> list[Path]:
+    """Returns the snapshots of all stick configs seen so far."""
+    if not KNOWN_CONFIGS_DIR.is_dir():
+        return []
+    return sorted(KNOWN_CONFIGS_DIR.glob("*.ini"))
 
 
 class ConfigManager:
@@ -50,24 +76,27 @@ class ConfigManager:
         self.config["USB"]["modelid"] = device.get("ID_MODEL_ID", "")
         self.save_config()
 
-    def get_distros(self) -> list[Distro]:
+    def get_distro_entries(self) -> list[tuple[str, str, str]]:
         """
-        Returns configured distros and their architectures.
-        Example output: {'Ubuntu': ['amd64', 'arm64'], 'Arch Linux': ['amd64']}
+        Returns the configured distros as (name, architecture, version) without resolving them.
+        Example output: [('Debian', 'amd64', 'latest'), ('Debian', 'arm64', 'latest')]
         """
         distros = []
         for key in self.config.keys():
-            if key == "USB":
+            if key in ("USB", "Stick"):
                 continue
             config_entry = self.config[key]
             if "name" in config_entry and "version" in config_entry and "architectures" in config_entry:
                 # valid config found
                 for architecture in config_entry["architectures"].split(","):
-                    distro = DISTROS[config_entry["name"]](architecture, config_entry["version"])
-                    distros.append(distro)
+                    distros.append((config_entry["name"], architecture.strip(), config_entry["version"]))
 
         return distros
 
+    def get_distros(self) -> list[Distro]:
+        """Returns the configured distros, resolved to their configured or latest release."""
+        return [DISTROS[name](architecture, version) for name, architecture, version in self.get_distro_entries()]
+
     def update_distro(self, distro_config_key: str, architectures: list[str]):
         """Updates or adds a new distro with its architectures."""
         if "Distros" not in self.config:
@@ -81,7 +110,18 @@ class ConfigManager:
             del self.config["Distros"][distro_config_key]
             self.save_config()
 
+    def get_stick_id(self) -> str:
+        """Returns the id of the stick holding this config, a new one is written on first use."""
+        if "Stick" not in self.config or "id" not in self.config["Stick"]:
+            self.config["Stick"] = {"id": uuid.uuid4().hex}
+            self._write_config()
+        return self.config["Stick"]["id"]
+
     def save_config(self):
         """Writes changes back to the config file."""
+        self._write_config()
+        register_config(self.config_file)
+
+    def _write_config(self) -> None:
         with open(self.config_file, "w") as configfile:
             self.config.write(configfile)
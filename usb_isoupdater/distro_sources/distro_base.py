@@ -31,6 +31,8 @@ class Distro:
     checksum_url = ""
     filename = ""
     architectures: list[str]
+    # alternative download urls for the same file, used when the download_url stalls
+    mirrors: tuple[str, ...] = ()
     version = ""
 
     def __init__(self, architecture, version):
@@ -40,10 +42,10 @@ class Distro:
         self.version = version
         self.checksums = {}
 
-    def download(self, path):
-        """Download the ISO file"""
+    def download(self, path, direct=False):
+        """Download the ISO file, direct writes it with O_DIRECT"""
         filepath = os.path.join(path, self.filename)
-        downloader = DownloadWithProgress(self.download_url, filepath)
+        downloader = DownloadWithProgress(self.download_url, filepath, direct=direct, mirrors=self.mirrors)
         downloader.download()
 
     def get_checksums(self):
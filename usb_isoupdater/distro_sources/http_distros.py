@@ -53,10 +53,12 @@ class Arch(Distro):
     config_key: ClassVar[str] = name.lower().replace(" ", "_")
     download_url: ClassVar[str] = "https://geo.mirror.pkgbuild.com/iso/latest/archlinux-x86_64.iso"
     checksum_url: ClassVar[str] = "https://geo.mirror.pkgbuild.com/iso/latest/sha256sums.txt"
+    mirrors: tuple[str, ...] = ("https://mirrors.kernel.org/archlinux/iso/latest/archlinux-x86_64.iso",)
     architectures: ClassVar[list[str]] = ["x86_64"]
 
-    def __init__(self, architecture):
-        super().__init__(architecture)
+    def __init__(self, architecture, version="latest"):
+        # Arch only publishes the latest ISO, the version is accepted for the config interface
+        super().__init__(architecture, version)
         filename = "archlinux-{}.iso"
         self.filename = filename.format(architecture)
 
@@ -74,7 +76,7 @@ class ArchTest(Distro):
         filename = "archlinux-{}.iso"
         self.filename = filename.format(architecture)
 
-    def download(self, path="."):
+    def download(self, path=".", direct=False):
         print("Testing Class, skipping download using present file")
         return f"archlinux-{self.arch}.iso"
 
@@ -100,6 +102,10 @@ class Debian(Distro):
         super().__init__(architecture, version)
 
         self.download_url = "https://cdimage.debian.org/debian-cd/current/{}/iso-cd/debian-{}-{}-netinst.iso"
+        mirrors = (
+            "https://ftp.acc.umu.se/debian-cd/current/{}/iso-cd/debian-{}-{}-netinst.iso",
+            "https://mirrors.kernel.org/debian-cd/current/{}/iso-cd/debian-{}-{}-netinst.iso",
+        )
         self.checksum_url = "https://cdimage.debian.org/debian-cd/current/{}/iso-cd/SHA256SUMS"
         filename = "debian-{}-{}-netinst.iso"
 
@@ -108,6 +114,7 @@ class Debian(Distro):
         else:
             self.version = version
         self.download_url = self.download_url.format(architecture, self.version, architecture)
+        self.mirrors = tuple(mirror.format(architecture, self.version, architecture) for mirror in mirrors)
         self.checksum_url = self.checksum_url.format(architecture)
         self.filename = filename.format(self.version, architecture)
 
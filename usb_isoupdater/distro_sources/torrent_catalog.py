@@ -0,0 +1,155 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import requests
+from distro_sources.torrent_distros import (
+    DISTROWATCH_URL,
+    FOSSTORRENTS_URL,
+    USER_AGENT,
+    TorrentDistro,
+    parse_distrowatch_table,
+    parse_fosstorrents_feed,
+)
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = Path.home() / ".cache" / "usb-isoupdater" / "torrent_catalog.json"
+
+# a parser gets the response and the urls already in the catalog,
+# it returns the new torrents and the urls of all torrents the source currently lists
+Parser = Callable[[requests.Response, set[str]], tuple[list[TorrentDistro], set[str]]]
+
+# source name -> (url, parser)
+SOURCES: dict[str, tuple[str, Parser]] = {
+    "fosstorrents": (FOSSTORRENTS_URL, lambda response, seen: parse_fosstorrents_feed(response.content, seen)),
+    "distrowatch": (DISTROWATCH_URL, lambda response, seen: parse_distrowatch_table(response.text, seen)),
+}
+
+# errors a parser raises when a source changed its layout
+PARSER_ERRORS = (AttributeError, IndexError, KeyError, TypeError, ValueError)
+
+
+class TorrentCatalog:
+    """
+    Deduplicated index of torrent ISOs from all torrent sources, persisted between runs.
+
+    Sources are fetched concurrently with conditional GETs, only entries that were not
+    seen before are parsed and merged, entries a source no longer lists are pruned.
+    Listing the catalog never touches the network.
+    """
+
+    def __init__(self, catalog_path: Path = CATALOG_PATH, sources: dict[str, tuple[str, Parser]] = SOURCES) -> None:
+        self.catalog_path = catalog_path
+        self.source_parsers = sources
+        # source name -> {"etag": ..., "last_modified": ..., "seen": [torrent urls already in entries]}
+        self.sources: dict[str, dict[str, Any]] = {}
+        # "distro|version|arch" -> {"name": ..., "torrent_url": ..., "arch": ..., "version": ...,
+        #                          "sources": {source name: torrent url of that source}}
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Loads the persisted catalog, if present."""
+        try:
+            with open(self.catalog_path) as f:
+                catalog = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            logger.warning(f"torrent catalog {self.catalog_path} is corrupt, rebuilding")
+            return
+        self.sources = catalog.get("sources", {})
+        self.entries = catalog.get("entries", {})
+
+    def save(self) -> None:
+        """Writes the catalog atomically."""
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"sources": self.sources, "entries": self.entries}, f, indent=1)
+        tmp_path.replace(self.catalog_path)
+
+    def list_distros(self) -> list[TorrentDistro]:
+        """Returns all cached torrent ISOs."""
+        return [
+            TorrentDistro(entry["name"], entry["torrent_url"], entry["arch"], entry["version"])
+            for entry in self.entries.values()
+        ]
+
+    def refresh(self) -> int:
+        """Fetches all sources concurrently and merges new entries, returns the number of new entries."""
+        for source in self.source_parsers:
+            self.sources.setdefault(source, {"seen": []})
+        with ThreadPoolExecutor(max_workers=len(self.source_parsers)) as executor:
+            results = dict(zip(self.source_parsers, executor.map(self._fetch_source, self.source_parsers)))
+
+        added = 0
+        for source, result in results.items():
+            if result is None:
+                # not modified or failed, keep what we have
+                continue
+            distros, current = result
+            self._prune(source, current)
+            for distro in distros:
+                key = "|".join(distro.catalog_key)
+                if key in self.entries:
+                    self.entries[key]["sources"].setdefault(source, distro.torrent_url)
+                    continue
+                self.entries[key] = {
+                    "name": distro.name,
+                    "torrent_url": distro.torrent_url,
+                    "arch": distro.architecture,
+                    "version": distro.version,
+                    "sources": {source: distro.torrent_url},
+                }
+                added += 1
+            # only urls that back an entry count as seen, duplicates get parsed again until they do
+            self.sources[source]["seen"] = sorted(
+                entry["sources"][source] for entry in self.entries.values() if source in entry["sources"]
+            )
+        self.save()
+        logger.info(f"torrent catalog refreshed, {added} new entries, {len(self.entries)} total")
+        return added
+
+    def _prune(self, source: str, current: set[str]) -> None:
+        """Drops entries that source no longer lists, e.g. superseded versions."""
+        for key, entry in list(self.entries.items()):
+            if entry["sources"].get(source, "") in current or source not in entry["sources"]:
+                continue
+            removed_url = entry["sources"].pop(source)
+            if not entry["sources"]:
+                del self.entries[key]
+            elif entry["torrent_url"] == removed_url:
+                entry["torrent_url"] = next(iter(entry["sources"].values()))
+
+    def _fetch_source(self, source: str) -> tuple[list[TorrentDistro], set[str]] | None:
+        url, parser = self.source_parsers[source]
+        state = self.sources[source]
+        headers = {"User-Agent": USER_AGENT}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        try:
+            response = requests.get(url, headers=headers, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"failed to fetch torrent source {source}: {e}")
+            return None
+        if response.status_code == 304:
+            logger.info(f"torrent source {source} not modified")
+            return None
+
+        try:
+            distros, current = parser(response, set(state["seen"]))
+        except PARSER_ERRORS as e:
+            logger.warning(f"failed to parse torrent source {source}: {e}")
+            return None
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+        logger.info(f"torrent source {source}: {len(distros)} new entries")
+        return distros, current
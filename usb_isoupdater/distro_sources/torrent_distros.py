@@ -1,66 +1,183 @@
+import argparse
+import re
+
 import feedparser
 import requests
 from bs4 import BeautifulSoup
-from distro_base import Distro
+from distro_sources.distro_base import Distro
+
+DISTROWATCH_URL = "https://distrowatch.com/dwres.php?resource=bittorrent"
+FOSSTORRENTS_URL = "https://fosstorrents.com/feed/torrents.xml"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:136.0) Gecko/20100101 Firefox/136.0"
+
+
+# spellings used by torrent sources -> canonical architecture, longest first so x86_64 wins over x86
+ARCHITECTURE_ALIASES = {
+    "x86_64": "amd64",
+    "x86-64": "amd64",
+    "64-bit": "amd64",
+    "64bit": "amd64",
+    "amd64": "amd64",
+    "aarch64": "arm64",
+    "arm64": "arm64",
+    "32-bit": "i386",
+    "32bit": "i386",
+    "i686": "i386",
+    "i386": "i386",
+    "mips64el": "mips64el",
+    "mipsel": "mipsel",
+    "ppc64le": "ppc64el",
+    "ppc64el": "ppc64el",
+    "s390x": "s390x",
+    "armhf": "armhf",
+    "armel": "armel",
+}
+ARCHITECTURE_PATTERN = re.compile(
+    r"(?<![a-z0-9])(" + "|".join(re.escape(alias) for alias in ARCHITECTURE_ALIASES) + r")(?![a-z0-9])",
+    re.IGNORECASE,
+)
+VERSION_PATTERN = re.compile(r"(?<![a-z0-9])\d+(?:\.\d+)*", re.IGNORECASE)
+IMAGE_EXTENSION_PATTERN = re.compile(r"(\.(iso|img|raw|torrent|xz|gz|bz2|zst|zip))+$", re.IGNORECASE)
 
 
 class TorrentDistro(Distro):
-    def __init__(self, name: str, torrent_url: str, arch):
+    def __init__(self, name: str, torrent_url: str, arch: str, version: str = ""):
         self.name = name
         self.torrent_url = torrent_url
         self.filename = torrent_url.split("/")[-1].split(".torrent")[0]
-        self.architecture = arch
+        self.architecture = parse_architecture(arch, self.filename, name)
+        self.version = version or parse_version(self.filename, name)
+
+    @property
+    def catalog_key(self) -> tuple[str, str, str]:
+        """
+        Identifies the same release across torrent sources.
+        Sources title the same file differently, so the distro is taken from the filename.
+        """
+        return parse_release_name(self.filename) or parse_distro_name(self.name), self.version, self.architecture
 
-    def download(self):
+    def download(self) -> None:
         # Implement download logic here
         pass
 
 
-def get_distros_from_distrowatch() -> list[TorrentDistro]:
+def parse_architecture(*candidates: str) -> str:
+    """Returns the canonical name of the first architecture found in the candidates, 'x86_64' -> 'amd64'."""
+    for candidate in candidates:
+        match = ARCHITECTURE_PATTERN.search(candidate)
+        if match:
+            return ARCHITECTURE_ALIASES[match.group(1).lower()]
+    return "unknown"
+
+
+def parse_version(*candidates: str) -> str:
+    """Returns the first version number found in the candidates, ignoring architecture tokens like x86_64."""
+    for candidate in candidates:
+        match = VERSION_PATTERN.search(ARCHITECTURE_PATTERN.sub(" ", candidate))
+        if match:
+            return match.group(0)
+    return ""
+
+
+def parse_release_name(filename: str) -> str:
     """
-    Fetches the list of Linux distributions from Distrowatch and returns a list of TorrentDistro objects.
+    Strips version, architecture and extension from an image filename, keeping the edition,
+    'linuxmint-21.3-cinnamon-64bit.iso' -> 'linuxmint cinnamon'.
     """
-    url = "https://distrowatch.com/dwres.php?resource=bittorrent"
-    response = requests.get(
-        url,
-        headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:136.0) Gecko/20100101 Firefox/136.0"},
-    )
-    response.raise_for_status()  # Raise an error for bad responses
-    soup = BeautifulSoup(response.text, "html.parser")
+    name = IMAGE_EXTENSION_PATTERN.sub("", filename)
+    name = ARCHITECTURE_PATTERN.sub(" ", name)
+    name = VERSION_PATTERN.sub(" ", name)
+    return " ".join(re.split(r"[\W_]+", name.lower())).strip()
+
+
+def parse_distro_name(name: str) -> str:
+    """
+    Strips version and architecture from a torrent title but keeps the edition,
+    'Linux Mint 21.3 Cinnamon (64-bit)' -> 'linux mint cinnamon'.
+    """
+    name = re.sub(r"\(.*?\)", " ", name)
+    name = ARCHITECTURE_PATTERN.sub(" ", name)
+    name = VERSION_PATTERN.sub(" ", name)
+    return " ".join(name.lower().split())
+
+
+def parse_distrowatch_table(html: str, seen: set[str] | None = None) -> tuple[list[TorrentDistro], set[str]]:
+    """
+    Parses the distrowatch bittorrent table.
+    Returns the torrents not in seen and the urls of all torrents currently listed.
+    """
+    seen = seen or set()
+    soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table", {"style": "width:100%; padding: 5px"})
+    if table is None:
+        raise ValueError("distrowatch bittorrent table not found")
     rows = table.find_all("tr")[1:]  # Skip the header row
 
-    distros = [
-        TorrentDistro(
-            row.contents[0].contents[0].contents[2],
-            row.contents[1].contents[0].attrs["href"],
-        )
-        for row in rows
-    ]
-
-    return distros
+    distros = []
+    current = set()
+    for row in rows:
+        torrent_url = row.contents[1].contents[0].attrs["href"]
+        current.add(torrent_url)
+        if torrent_url in seen:
+            continue
+        name = str(row.contents[0].contents[0].contents[2]).strip()
+        distros.append(TorrentDistro(name, torrent_url, ""))
+    return distros, current
 
 
-def get_distros_from_fosstorrents() -> list[TorrentDistro]:
+def parse_fosstorrents_feed(content: bytes, seen: set[str] | None = None) -> tuple[list[TorrentDistro], set[str]]:
     """
-    Fetches the list of Linux distributions from Fosstorrents and returns a list of TorrentDistro objects.
+    Parses the fosstorrents feed.
+    Returns the entries not in seen and the urls of all entries currently in the feed.
     """
-    url = "https://fosstorrents.com/feed/torrents.xml"
-    feed = feedparser.parse(url)
+    seen = seen or set()
+    feed = feedparser.parse(content)
     distros = []
+    current = set()
     for entry in feed.entries:
+        current.add(entry.link)
+        if entry.link in seen:
+            continue
         name = entry.title
         torrent_url = entry.link
         arch = entry.title.split("(")[-1][:-1]
         distros.append(TorrentDistro(name, torrent_url, arch))
-    return distros
+    return distros, current
 
 
-def main():
-    distros = []
-    distros = get_distros_from_fosstorrents()
-    for distro in distros:
-        print(f"Name: {distro.name}, Link: {distro.torrent_url}")
+def get_distros_from_distrowatch() -> list[TorrentDistro]:
+    """
+    Fetches the list of Linux distributions from Distrowatch and returns a list of TorrentDistro objects.
+    """
+    response = requests.get(DISTROWATCH_URL, headers={"User-Agent": USER_AGENT}, timeout=10)
+    response.raise_for_status()  # Raise an error for bad responses
+    return parse_distrowatch_table(response.text)[0]
+
+
+def get_distros_from_fosstorrents() -> list[TorrentDistro]:
+    """
+    Fetches the list of Linux distributions from Fosstorrents and returns a list of TorrentDistro objects.
+    """
+    response = requests.get(FOSSTORRENTS_URL, headers={"User-Agent": USER_AGENT}, timeout=10)
+    response.raise_for_status()
+    return parse_fosstorrents_feed(response.content)[0]
+
+
+def main() -> None:
+    # imported here, the catalog itself builds on the parsers in this module
+    from distro_sources.torrent_catalog import TorrentCatalog
+
+    parser = argparse.ArgumentParser(description="List torrent ISOs from the cached catalog")
+    parser.add_argument("-r", "--refresh", help="Fetch new entries from all torrent sources", action="store_true")
+    args = parser.parse_args()
+
+    catalog = TorrentCatalog()
+    if args.refresh or not catalog.entries:
+        catalog.refresh()
+    for distro in catalog.list_distros():
+        print(
+            f"Name: {distro.name}, Version: {distro.version}, Arch: {distro.architecture}, Link: {distro.torrent_url}"
+        )
 
 
 if __name__ == "__main__":
@@ -12,7 +12,9 @@ from distro_sources.distro_base import Distro
 from InquirerPy import inquirer
 from InquirerPy.base.control import Choice
 
-from usb_isoupdater.config import CONFIG_FILENAME, ConfigManager
+from usb_isoupdater.config import CONFIG_FILENAME, ConfigManager, register_config
+from usb_isoupdater.media_writer import copy_to_media
+from usb_isoupdater.prefetch import DEFAULT_INTERVAL, PrefetchScheduler, staged_file
 
 if typing.TYPE_CHECKING:
     from psutil._common import sdiskpart
@@ -34,18 +36,31 @@ logger = logging.getLogger(__name__)
 
 def main():
     parser = argparse.ArgumentParser(description="Manage and Update ISOs on removable Media")
-    parser.add_argument("path", help="Path to your mounted media")
+    parser.add_argument("path", nargs="?", default=".", help="Path to your mounted media")
     parser.add_argument("-c", "--configure", help="Configure the updater", action="store_true")
+    parser.add_argument(
+        "-p", "--prefetch", help="Stage new releases for all known media in the background", action="store_true"
+    )
+    parser.add_argument(
+        "-d", "--direct", help="Write ISOs to the media with O_DIRECT, bypassing the page cache", action="store_true"
+    )
+    parser.add_argument(
+        "--interval", type=int, default=DEFAULT_INTERVAL, help="Seconds between prefetch runs, default: %(default)s"
+    )
     args = parser.parse_args()
     logging.info(f"starting with args: {args}")
 
-    Isoupdater(args)
+    if args.prefetch:
+        PrefetchScheduler(interval=args.interval).run()
+    else:
+        Isoupdater(args)
 
 
 class Isoupdater:
     def __init__(self, args):
         self.path = Path(args.path)
         self.configure = args.configure
+        self.direct = args.direct
         self.config: ConfigManager
         self.last_message = ""
         self.usb_device: pyudev.Device | None = None
@@ -71,6 +86,8 @@ class Isoupdater:
             self.config = ConfigManager(self.config_path)
         except FileNotFoundError:
             logging.info(f"no config file found in {self.path}")
+        # remember this config so the prefetcher can stage its distros while the media is unplugged
+        register_config(self.config_path)
         self.configured_usb_device = self.config.get_usb_device()
         if self.configured_usb_device:
             self.connected_usb_device = self._find_configured_usb_device()
@@ -208,30 +225,36 @@ class Isoupdater:
         if not self.config:
             logger.info("Download called with empty config")
             self.last_message = "no configuration"
-        configured_distros = self.config.get_distros()
-        for distro_config_key, configured_architectures in configured_distros.items():
-            distro = self._get_distro_by_key(distro_config_key)
-            logger.info(f"Checking {distro.name}")
-            for arch in configured_architectures:
-                initialised_distro: Distro = distro(arch)
-                if self._check_iso_present(initialised_distro):
-                    if initialised_distro.verify_checksum(self.path):
-                        logging.info(f"{initialised_distro.name} {arch} is up to date")
-                        continue
-                    else:
-                        logging.info(f"{initialised_distro.name} {arch} is old, redownloading")
-                logger.info(f"Downloading {initialised_distro.name} {arch}")
-                initialised_distro.download(self.path)
-                logger.info(f"Verifying {initialised_distro.name} {arch}")
+        for initialised_distro in self.config.get_distros():
+            arch = initialised_distro.arch
+            logger.info(f"Checking {initialised_distro.name}")
+            if self._check_iso_present(initialised_distro):
                 if initialised_distro.verify_checksum(self.path):
-                    logger.info(f"{initialised_distro.name} {arch} downloaded successfully")
-                    self.last_message = "download successfull"
+                    logging.info(f"{initialised_distro.name} {arch} is up to date")
+                    continue
                 else:
-                    logger.info(f"{distro.name} {arch} download failed")
-                    self.last_message = "download failed"
+                    logging.info(f"{initialised_distro.name} {arch} is old, redownloading")
+            staged = staged_file(initialised_distro)
+            if staged:
+                logger.info(f"Copying prefetched {initialised_distro.name} {arch}")
+                copy_to_media(staged, self.path.joinpath(initialised_distro.filename), direct=self.direct)
+                if initialised_distro.verify_checksum(self.path):
+                    logger.info(f"{initialised_distro.name} {arch} copied successfully")
+                    self.last_message = "download successfull"
+                    continue
+                logger.info(f"prefetched {initialised_distro.name} {arch} is outdated or corrupt, downloading")
+            logger.info(f"Downloading {initialised_distro.name} {arch}")
+            initialised_distro.download(self.path, direct=self.direct)
+            logger.info(f"Verifying {initialised_distro.name} {arch}")
+            if initialised_distro.verify_checksum(self.path):
+                logger.info(f"{initialised_distro.name} {arch} downloaded successfully")
+                self.last_message = "download successfull"
+            else:
+                logger.info(f"{initialised_distro.name} {arch} download failed")
+                self.last_message = "download failed"
 
     def update(self):
-        pass
+        self.action_download_isos()
 
     def _get_usb_devices_udev(self) -> list[pyudev.Device]:
         """Returns a list of mounted USB devices"""
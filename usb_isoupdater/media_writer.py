@@ -0,0 +1,237 @@
+import ctypes
+import ctypes.util
+import fcntl
+import logging
+import mmap
+import os
+import time
+from dataclasses import dataclass
+from types import TracebackType
+
+logger = logging.getLogger(__name__)
+
+# 4 MiB is a multiple of the erase block size of most flash media
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+# fsync after this many bytes to keep the amount of dirty pages bounded
+DEFAULT_SYNC_INTERVAL = 64 * 1024 * 1024
+# O_DIRECT requires buffers and offsets aligned to the logical block size
+DIRECT_IO_ALIGNMENT = 4096
+# reserve blocks without changing the file size, so the kernel never zero fills them
+FALLOC_FL_KEEP_SIZE = 0x01
+
+
+@dataclass
+class WriteStats:
+    """Accumulated write statistics for a single block device."""
+
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Sustained write throughput in bytes per second."""
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes_written / self.seconds
+
+
+DEVICE_STATS: dict[str, WriteStats] = {}
+
+
+def device_throughput(path: str | os.PathLike) -> float:
+    """Returns the sustained write throughput in bytes per second of the device holding path."""
+    stats = DEVICE_STATS.get(_device_id(path))
+    return stats.throughput if stats else 0.0
+
+
+def _device_id(path: str | os.PathLike) -> str:
+    """Returns the major:minor number of the device holding path."""
+    st_dev = os.stat(os.path.dirname(os.path.abspath(path))).st_dev
+    return f"{os.major(st_dev)}:{os.minor(st_dev)}"
+
+
+def _fallocate_keep_size(fd: int, size: int) -> None:
+    """
+    Reserves size bytes for fd with fallocate(2) and FALLOC_FL_KEEP_SIZE.
+
+    posix_fallocate is not used on purpose: on vfat it extends the file by zero filling it
+    and on filesystems without fallocate support glibc emulates it by writing every block,
+    both of which write the whole ISO size to the stick once more.
+    Raises OSError if the filesystem does not support it.
+    """
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    fallocate = libc.fallocate
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    if fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+class MediaWriter:
+    """
+    Writes a file to removable media in a flash friendly way.
+
+    The file's blocks are reserved up front to avoid fragmentation on FAT/exFAT,
+    data is written in large aligned blocks and synced at a fixed interval so the
+    page cache never builds up and unmounting is instant once the file is closed.
+    """
+
+    def __init__(
+        self,
+        filepath: str | os.PathLike,
+        total_size: int | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        sync_interval: int = DEFAULT_SYNC_INTERVAL,
+        direct: bool = False,
+    ) -> None:
+        if block_size % DIRECT_IO_ALIGNMENT:
+            raise ValueError(f"block_size must be a multiple of {DIRECT_IO_ALIGNMENT}")
+        self.filepath = filepath
+        self.total_size = total_size
+        self.block_size = block_size
+        self.sync_interval = sync_interval
+        self.direct = direct and hasattr(os, "O_DIRECT")
+        self.device = _device_id(filepath)
+        self.fd: int | None = None
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.synced_offset = 0
+        # time spent in write and sync calls only, the writer may stay open while a slow mirror sends data
+        self.io_seconds = 0.0
+        # unlike bytes_written this survives a rewind, the device did write those bytes
+        self.io_bytes = 0
+        # O_DIRECT needs a page aligned buffer, anonymous mmaps always are
+        self.aligned_buffer = mmap.mmap(-1, block_size) if self.direct else None
+
+    def __enter__(self) -> "MediaWriter":
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Opens the target file and reserves its full size."""
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        if self.direct:
+            flags |= os.O_DIRECT
+        try:
+            self.fd = os.open(self.filepath, flags, 0o644)
+        except OSError:
+            if not self.direct:
+                raise
+            # not every filesystem supports O_DIRECT, fall back to buffered writes
+            logger.info(f"O_DIRECT not supported for {self.filepath}, using buffered writes")
+            self.direct = False
+            self.aligned_buffer = None
+            self.fd = os.open(self.filepath, flags & ~os.O_DIRECT, 0o644)
+        if self.total_size:
+            self._preallocate(self.total_size)
+
+    def write(self, data: bytes) -> None:
+        """Buffers data and writes it out in full blocks."""
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._write_block(self.buffer[: self.block_size])
+            del self.buffer[: self.block_size]
+
+    def rewind(self) -> None:
+        """Discards everything written so far, used when a transfer has to start over."""
+        self.buffer.clear()
+        os.ftruncate(self._fd(), 0)
+        os.lseek(self._fd(), 0, os.SEEK_SET)
+        self.bytes_written = 0
+        self.synced_offset = 0
+
+    def close(self) -> None:
+        """Writes the remaining data, syncs the file to the device and records the throughput."""
+        if self.fd is None:
+            return
+        fd = self.fd
+        try:
+            if self.buffer:
+                self._write_tail(bytes(self.buffer))
+                self.buffer.clear()
+            # drop any reserved space that was not used
+            os.ftruncate(fd, self.bytes_written)
+            started = time.monotonic()
+            os.fsync(fd)
+            self.io_seconds += time.monotonic() - started
+            self._drop_cache(self.synced_offset, self.bytes_written - self.synced_offset)
+        finally:
+            os.close(fd)
+            self.fd = None
+            if self.aligned_buffer is not None:
+                self.aligned_buffer.close()
+        self._record_stats()
+
+    def _fd(self) -> int:
+        if self.fd is None:
+            raise ValueError(f"{self.filepath} is not open")
+        return self.fd
+
+    def _preallocate(self, size: int) -> None:
+        try:
+            _fallocate_keep_size(self._fd(), size)
+        except (OSError, AttributeError) as e:
+            # no fallocate in libc or not supported by the filesystem, write without reserving
+            logger.info(f"skipping preallocation of {self.filepath}: {e}")
+
+    def _write_block(self, block: bytes | bytearray | mmap.mmap) -> None:
+        if self.aligned_buffer is not None:
+            self.aligned_buffer.seek(0)
+            self.aligned_buffer.write(block)
+            block = self.aligned_buffer
+        started = time.monotonic()
+        written = os.write(self._fd(), block)
+        self.io_seconds += time.monotonic() - started
+        self._advance(written)
+
+    def _write_tail(self, data: bytes) -> None:
+        if self.direct:
+            # the final block is usually not aligned, finish it with buffered io
+            flags = fcntl.fcntl(self._fd(), fcntl.F_GETFL)
+            fcntl.fcntl(self._fd(), fcntl.F_SETFL, flags & ~os.O_DIRECT)
+        view = memoryview(data)
+        while view:
+            started = time.monotonic()
+            written = os.write(self._fd(), view)
+            self.io_seconds += time.monotonic() - started
+            view = view[written:]
+            self._advance(written)
+
+    def _advance(self, written: int) -> None:
+        self.bytes_written += written
+        self.io_bytes += written
+        if self.bytes_written - self.synced_offset >= self.sync_interval:
+            started = time.monotonic()
+            os.fdatasync(self._fd())
+            self.io_seconds += time.monotonic() - started
+            self._drop_cache(self.synced_offset, self.bytes_written - self.synced_offset)
+            self.synced_offset = self.bytes_written
+
+    def _drop_cache(self, offset: int, length: int) -> None:
+        """Evicts already synced pages, the file is written once and not read back soon."""
+        if hasattr(os, "posix_fadvise") and length > 0:
+            os.posix_fadvise(self._fd(), offset, length, os.POSIX_FADV_DONTNEED)
+
+    def _record_stats(self) -> None:
+        stats = DEVICE_STATS.setdefault(self.device, WriteStats())
+        stats.bytes_written += self.io_bytes
+        stats.seconds += self.io_seconds
+        logger.info(
+            f"wrote {self.io_bytes} bytes to {self.filepath} in {self.io_seconds:.1f}s of io, "
+            f"device {self.device} sustained {stats.throughput / 1024 / 1024:.1f} MiB/s"
+        )
+
+
+def copy_to_media(source: str | os.PathLike, filepath: str | os.PathLike, direct: bool = False) -> None:
+    """Copies a local file to removable media through a MediaWriter."""
+    with open(source, "rb") as src, MediaWriter(filepath, os.path.getsize(source), direct=direct) as writer:
+        for chunk in iter(lambda: src.read(DEFAULT_BLOCK_SIZE), b""):
+            writer.write(chunk)
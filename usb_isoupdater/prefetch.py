@@ -0,0 +1,118 @@
+import configparser
+import logging
+import os
+import time
+from pathlib import Path
+
+from distro_sources.distro_base import Distro
+from distro_sources.http_distros import DISTROS
+
+from usb_isoupdater.config import CACHE_DIR, ConfigManager, known_configs
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = CACHE_DIR / "staging"
+# downloads land here first and are only moved into the staging area once verified
+PARTIAL_DIR_NAME = ".part"
+DEFAULT_INTERVAL = 6 * 60 * 60
+
+
+def staged_file(distro: Distro, staging_dir: Path = STAGING_DIR) -> Path | None:
+    """Returns the staged ISO for the distro, if the prefetcher has already downloaded and verified it."""
+    staged: Path = staging_dir / distro.filename
+    if staged.is_file():
+        return staged
+    return None
+
+
+class PrefetchScheduler:
+    """
+    Downloads new releases of all distros configured on known sticks into a host side staging area.
+
+    Every stick config the updater has seen is snapshotted (see config.register_config), so
+    the scheduler can poll for new releases while no stick is plugged in. Updating a stick
+    then only needs a local copy from the staging area.
+    """
+
+    def __init__(self, staging_dir: Path = STAGING_DIR, interval: int = DEFAULT_INTERVAL) -> None:
+        self.staging_dir = staging_dir
+        self.partial_dir = staging_dir / PARTIAL_DIR_NAME
+        self.interval = interval
+        # set when a config could not be resolved, outdated files are only removed after a complete pass
+        self.incomplete = False
+
+    def run(self) -> None:
+        """Prefetches forever, once every interval seconds."""
+        logger.info(f"starting prefetch every {self.interval}s into {self.staging_dir}")
+        while True:
+            try:
+                self.prefetch_once()
+            except Exception:
+                # a single bad pass must not end the daemon
+                logger.exception("prefetch pass failed")
+            time.sleep(self.interval)
+
+    def prefetch_once(self) -> None:
+        """Stages the current release of every configured distro and removes outdated ones."""
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.incomplete = False
+        wanted = set()
+        for distro in self.configured_distros():
+            wanted.add(distro.filename)
+            try:
+                self._stage(distro)
+            except Exception as e:
+                logger.warning(f"prefetching {distro.name} {distro.arch} failed: {e}")
+        if not self.incomplete:
+            self._remove_outdated(wanted)
+
+    def configured_distros(self) -> list[Distro]:
+        """Returns the union of distros in all known stick configs, resolved to their current release."""
+        distros: dict[str, Distro] = {}
+        for config_file in known_configs():
+            try:
+                entries = ConfigManager(config_file).get_distro_entries()
+            except (configparser.Error, OSError) as e:
+                logger.warning(f"failed to read {config_file}: {e}")
+                self.incomplete = True
+                continue
+            for name, architecture, version in entries:
+                try:
+                    distro = DISTROS[name](architecture, version)
+                except Exception as e:
+                    logger.warning(f"failed to resolve {name} {architecture} from {config_file}: {e}")
+                    self.incomplete = True
+                    continue
+                distros.setdefault(distro.filename, distro)
+        return list(distros.values())
+
+    def _stage(self, distro: Distro) -> None:
+        if staged_file(distro, self.staging_dir) and self._verify(distro, self.staging_dir):
+            logger.info(f"{distro.filename} already staged")
+            return
+        logger.info(f"prefetching {distro.filename}")
+        partial = self.partial_dir / distro.filename
+        try:
+            distro.download(str(self.partial_dir))
+            if not self._verify(distro, self.partial_dir):
+                raise ValueError(f"{distro.filename} failed verification")
+            os.replace(partial, self.staging_dir / distro.filename)
+        finally:
+            # never leave a partial download behind, it would be mistaken for a finished one
+            partial.unlink(missing_ok=True)
+
+    def _verify(self, distro: Distro, path: Path) -> bool:
+        """
+        Returns whether the ISO in path matches its checksum.
+        Network errors propagate, an unreachable checksum host says nothing about the staged file.
+        """
+        try:
+            return bool(distro.verify_checksum(path))
+        except FileNotFoundError:
+            return False
+
+    def _remove_outdated(self, wanted: set[str]) -> None:
+        for staged in self.staging_dir.iterdir():
+            if staged.is_file() and staged.name not in wanted:
+                logger.info(f"removing outdated {staged.name} from staging")
+                staged.unlink()
@@ -1,35 +1,181 @@
+import http.client
+import logging
+import socket
+import time
+import urllib.error
 import urllib.request
+from collections import deque
+from collections.abc import Sequence
+
 from tqdm import tqdm
 
+from usb_isoupdater.media_writer import DEFAULT_BLOCK_SIZE, MediaWriter
+
+logger = logging.getLogger(__name__)
+
+# seconds a single read may block before the connection counts as hung
+DEFAULT_READ_TIMEOUT = 30
+# a transfer slower than this over the whole speed window counts as stalled
+DEFAULT_MIN_SPEED = 64 * 1024
+DEFAULT_SPEED_WINDOW = 30
+# attempts without progress a single mirror may cause before the download moves on to the next one
+DEFAULT_ERROR_BUDGET = 3
+
+# errors of the connection itself, anything else (e.g. a full stick) is not the mirror's fault
+NETWORK_ERRORS = (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError, socket.timeout)
+
+
+class TransferFailed(Exception):
+    """Raised when an attempt to transfer from a mirror fails on the network side."""
+
+
+class TransferStalled(TransferFailed):
+    """Raised when a transfer stays below the minimum speed for the whole speed window."""
+
+
+class MirrorMismatch(TransferFailed):
+    """Raised when a mirror serves a different file than the one the download started with."""
+
 
 class DownloadWithProgress:
-    def __init__(self, url, filepath):
+    def __init__(
+        self,
+        url: str,
+        filepath: str,
+        direct: bool = False,
+        mirrors: Sequence[str] = (),
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        min_speed: float = DEFAULT_MIN_SPEED,
+        speed_window: float = DEFAULT_SPEED_WINDOW,
+        error_budget: int = DEFAULT_ERROR_BUDGET,
+    ) -> None:
         self.url = url
         self.filepath = filepath
-        self.progress_bar = None
-
-    def download_progress_hook(self, block_num, block_size, total_size):
-        """Custom reporthook for tracking download progress."""
-        downloaded = block_num * block_size
-        if total_size > 0:
-            # Update progress bar based on the downloaded size
-            self.progress_bar.update(downloaded - self.progress_bar.n)
-
-        if downloaded >= total_size:
-            self.progress_bar.close()
-
-    def download(self):
-        """Method to download a file with a progress bar."""
-        with urllib.request.urlopen(self.url) as response:
-            total_size = response.length
-            self.progress_bar = tqdm(
-                total=total_size,
-                unit="B",
-                unit_scale=True,
-                desc=self.filepath.split("/")[-1],
-            )
-
-            # Use urlretrieve with the custom progress hook
-            urllib.request.urlretrieve(
-                self.url, self.filepath, reporthook=self.download_progress_hook
-            )
+        self.direct = direct
+        # the primary url is tried first, mirrors are only used once it exhausted its error budget
+        self.urls = [url, *mirrors]
+        self.read_timeout = read_timeout
+        self.min_speed = min_speed
+        self.speed_window = speed_window
+        self.error_budget = error_budget
+        self.errors = dict.fromkeys(self.urls, 0)
+        self.progress_bar: tqdm | None = None
+        self.total_size: int | None = None
+        self.offset = 0
+
+    def download(self) -> None:
+        """Method to download a file with a progress bar, resuming stalled transfers on the same or another mirror."""
+        writer = MediaWriter(self.filepath, direct=self.direct)
+        try:
+            for url in self.urls:
+                while self.errors[url] < self.error_budget:
+                    offset = self.offset
+                    try:
+                        self._transfer(url, writer)
+                    except MirrorMismatch as e:
+                        logger.warning(f"skipping {url}: {e}")
+                        self.errors[url] = self.error_budget
+                        continue
+                    except TransferFailed as e:
+                        # a stall always counts, a trickling mirror makes some progress on every attempt,
+                        # a dropped connection only counts if it got nowhere
+                        if isinstance(e, TransferStalled) or self.offset <= offset:
+                            self.errors[url] += 1
+                        logger.warning(
+                            f"transfer of {self.filepath} from {url} interrupted at {self.offset} bytes "
+                            f"({self.errors[url]}/{self.error_budget}): {e}"
+                        )
+                        continue
+                    return
+                logger.warning(f"{url} exhausted its error budget")
+            raise ConnectionError(f"all mirrors failed for {self.filepath}")
+        finally:
+            writer.close()
+            if self.progress_bar is not None:
+                self.progress_bar.close()
+
+    def _transfer(self, url: str, writer: MediaWriter) -> None:
+        """Streams url from the current offset into writer."""
+        request = urllib.request.Request(url)
+        if self.offset:
+            request.add_header("Range", f"bytes={self.offset}-")
+        try:
+            response = urllib.request.urlopen(request, timeout=self.read_timeout)
+        except NETWORK_ERRORS as e:
+            raise TransferFailed(e) from e
+        with response:
+            self._check_response(url, response, writer)
+            window: deque[tuple[float, int]] = deque([(time.monotonic(), self.offset)])
+            while True:
+                try:
+                    # read1 returns whatever arrived, so a trickling mirror is noticed without waiting for a full block
+                    chunk = response.read1(DEFAULT_BLOCK_SIZE)
+                except NETWORK_ERRORS as e:
+                    raise TransferFailed(e) from e
+                if not chunk:
+                    break
+                writer.write(chunk)
+                self.offset += len(chunk)
+                self._progress_bar().update(len(chunk))
+                self._check_speed(window)
+
+        if self.total_size and self.offset < self.total_size:
+            raise TransferFailed(f"connection closed {self.total_size - self.offset} bytes early")
+
+    def _check_response(self, url: str, response: http.client.HTTPResponse, writer: MediaWriter) -> None:
+        """Makes sure the response continues the file at the current offset, restarting if Range was ignored."""
+        if response.status == 206:
+            start, total = self._parse_content_range(response.headers.get("Content-Range", ""))
+        else:
+            start, total = 0, response.length
+        if self.progress_bar is None:
+            self._start(total, writer)
+        elif self.total_size is not None and total is not None and total != self.total_size:
+            raise MirrorMismatch(f"serves {total} bytes instead of {self.total_size}")
+
+        if start == self.offset:
+            return
+        if response.status == 206:
+            # resuming anywhere else would leave a gap or a duplicate in the file
+            raise MirrorMismatch(f"resumes at {start} instead of {self.offset} bytes")
+        # the mirror ignored the Range header, start over from the beginning
+        logger.info(f"{url} does not support resuming, restarting {self.filepath}")
+        writer.rewind()
+        self.offset = 0
+        self._progress_bar().reset(total=self.total_size)
+
+    @staticmethod
+    def _parse_content_range(content_range: str) -> tuple[int, int | None]:
+        """Parses 'bytes 100-199/200' into (100, 200), the total is None if unknown."""
+        try:
+            byte_range, total = content_range.split(" ", 1)[1].split("/")
+            return int(byte_range.split("-")[0]), None if total == "*" else int(total)
+        except (IndexError, ValueError) as e:
+            raise TransferFailed(f"invalid Content-Range {content_range!r}") from e
+
+    def _start(self, total_size: int | None, writer: MediaWriter) -> None:
+        self.total_size = total_size
+        self.progress_bar = tqdm(
+            total=self.total_size,
+            unit="B",
+            unit_scale=True,
+            desc=self.filepath.split("/")[-1],
+        )
+        writer.total_size = self.total_size
+        writer.open()
+
+    def _progress_bar(self) -> tqdm:
+        if self.progress_bar is None:
+            raise ValueError("download not started")
+        return self.progress_bar
+
+    def _check_speed(self, window: deque[tuple[float, int]]) -> None:
+        """Raises TransferStalled if the average speed over the sliding window is below the minimum."""
+        now = time.monotonic()
+        window.append((now, self.offset))
+        while now - window[1][0] >= self.speed_window:
+            window.popleft()
+        started, start_offset = window[0]
+        elapsed = now - started
+        if elapsed >= self.speed_window and (self.offset - start_offset) / elapsed < self.min_speed:
+            raise TransferStalled(f"below {self.min_speed} B/s for {elapsed:.0f}s")